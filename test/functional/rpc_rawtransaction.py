@@ -12,8 +12,10 @@ Test the following RPCs:
    - decoderawtransaction
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
+from test_framework.authproxy import JSONRPCException
 from test_framework.blocktools import COINBASE_MATURITY
 from test_framework.messages import (
     CTransaction,
@@ -28,6 +30,57 @@ from test_framework.util import (
 
 
 TXID = "1d1d4e24ed99057e84c3f80fd8fbec79ed9e1acee37da269356ecea000000000"
+ERR_NO_TXINDEX = (
+    "No such mempool transaction. Use -txindex or provide a block hash to enable"
+    " blockchain transaction queries. Use gettransaction for wallet transactions."
+)
+INVALID_HEX = "ZZZ0000000000000000000000000000000000000000000000000000000000000"
+ZERO_HASH = "0" * 64
+
+
+def batch_results(node, requests):
+    """Send requests to node as a single JSON-RPC batch.
+
+    Returns the results in request order. Raises a JSONRPCException for the
+    first request that returned an error."""
+    responses = {response['id']: response for response in node.batch(requests)}
+    results = []
+    for request in requests:
+        response = responses[request['id']]
+        if response['error'] is not None:
+            raise JSONRPCException(response['error'])
+        results.append(response['result'])
+    return results
+
+
+def check_rpc_error(code, message, error):
+    """Check a JSON-RPC error object from a batch response against the expected
+    code and [a substring of] the expected message, like try_rpc() does for a
+    single call. Set code or message to None to skip that check."""
+    if (code is not None) and (code != error['code']):
+        raise AssertionError("Unexpected JSONRPC error code %i (expected %i)" % (error['code'], code))
+    if (message is not None) and (message not in error['message']):
+        raise AssertionError(
+            "Expected substring not found in error message:\nsubstring: '{}'\nerror message: '{}'.".format(
+                message, error['message']))
+
+
+def assert_raises_rpc_error_batch(node, method, cases):
+    """Send calls of method to node as a single JSON-RPC batch and check that
+    each of them fails with the expected error.
+
+    cases is a list of (code, message, params) tuples, where params holds the
+    positional (list) or named (dict) arguments of the call and message is [a
+    substring of] the expected error string."""
+    rpc = getattr(node, method)
+    requests = [rpc.get_request(**params) if isinstance(params, dict) else rpc.get_request(*params) for _, _, params in cases]
+    responses = {response['id']: response for response in node.batch(requests)}
+    for request, (code, message, _) in zip(requests, cases):
+        error = responses[request['id']]['error']
+        if error is None:
+            raise AssertionError("No exception raised for request {} (expected JSONRPC error code {}, message '{}')".format(
+                request['id'], code, message))
+        check_rpc_error(code, message, error)
 
 
 class multidict(dict):
@@ -53,10 +106,10 @@ class RawTransactionsTest(BitcoinTestFramework):
         self.setup_clean_chain = True
         self.num_nodes = 4
         self.extra_args = [
-            ["-txindex"],
-            ["-txindex"],
             ["-txindex"],
             [],
+            [],
+            [],
         ]
         # whitelist all peers to speed up tx relay / mempool sync
         for args in self.extra_args:
@@ -71,14 +124,63 @@ class RawTransactionsTest(BitcoinTestFramework):
         super().setup_network()
         self.connect_nodes(0, 2)
 
+    def sync_mempools_rpc(self):
+        """Push mempool transactions that a node is missing to it over RPC,
+        rather than waiting for them to be relayed over P2P, then wait for all
+        mempools to match."""
+        mempools = [node.getrawmempool(True) for node in self.nodes]
+        entries = {}
+        for mempool in mempools:
+            entries.update(mempool)
+        # Submit parents before their children
+        for txid in sorted(entries, key=lambda txid: entries[txid]['ancestorcount']):
+            source = next(node for node, mempool in zip(self.nodes, mempools) if txid in mempool)
+            for node, mempool in zip(self.nodes, mempools):
+                if txid not in mempool:
+                    node.sendrawtransaction(source.getrawtransaction(txid), 0)
+        self.sync_mempools(wait=0.1)
+
+    def fill_address_pool(self, counts):
+        """Fetch new addresses for each node index in counts, with one JSON-RPC
+        batch per node, into self.addr_pool."""
+        self.addr_pool = {}
+        for n, count in counts.items():
+            node = self.nodes[n]
+            self.addr_pool[n] = batch_results(node, [node.getnewaddress.get_request() for _ in range(count)])
+
+    def get_address_infos(self, n, addresses):
+        """Look up getaddressinfo for several addresses of node n in one JSON-RPC batch."""
+        node = self.nodes[n]
+        return batch_results(node, [node.getaddressinfo.get_request(address) for address in addresses])
+
+    def new_address(self, n):
+        """Return a new address of node n, taken from self.addr_pool."""
+        assert self.addr_pool[n], f"Address pool of node {n} is empty, update the counts in run_test"
+        return self.addr_pool[n].pop()
+
     def run_test(self):
+        # Fetch the new addresses used throughout the test with one batch per node.
+        # Every new_address() call site is counted here; run_test checks that
+        # the pools end up empty.
+        legacy = not self.options.descriptors
+        self.fill_address_pool({
+            # getrawtransaction 1, createrawtransaction 2, signrawtransactionwithwallet 3,
+            # sendrawtransaction 1, testmempoolaccept 2, legacy multisig 2
+            0: 9 + (2 if legacy else 0),
+            # getrawtransaction 3, legacy multisig 2
+            1: 3 + (2 if legacy else 0),
+            # setup 3, testmempoolaccept 2, legacy multisig 5
+            2: 5 + (5 if legacy else 0),
+        })
+
         self.log.info("Prepare some coins for multiple *rawtransaction commands")
         self.generate(self.nodes[2], 1)
-        self.generate(self.nodes[0], COINBASE_MATURITY + 1)
-        for amount in [1.5, 1.0, 5.0]:
-            self.nodes[0].sendtoaddress(self.nodes[2].getnewaddress(), amount)
-        self.sync_all()
-        self.generate(self.nodes[0], 5)
+        # Only node0 needs these blocks to fund the sends below; the block
+        # mining the sends syncs the whole chain to all nodes in one go.
+        self.generate(self.nodes[0], COINBASE_MATURITY + 1, sync_fun=self.no_op)
+        amounts = [1.5, 1.0, 5.0]
+        batch_results(self.nodes[0], [self.nodes[0].sendtoaddress.get_request(self.new_address(2), amount) for amount in amounts])
+        self.generate(self.nodes[0], 1)
 
         self.getrawtransaction_tests()
         self.createrawtransaction_tests()
@@ -90,21 +192,19 @@ class RawTransactionsTest(BitcoinTestFramework):
         if not self.options.descriptors:
             self.raw_multisig_transaction_legacy_tests()
 
+        assert_equal(self.addr_pool, {0: [], 1: [], 2: []})
+
     def getrawtransaction_tests(self):
-        addr = self.nodes[1].getnewaddress()
+        addr = self.new_address(1)
         txid = self.nodes[0].sendtoaddress(addr, 10)
         self.generate(self.nodes[0], 1)
-        vout = find_vout_for_address(self.nodes[1], txid, addr)
-        rawTx = self.nodes[1].createrawtransaction([{'txid': txid, 'vout': vout}], [{self.nodes[1].getnewaddress(): 9.999}, {"fee": 0.001}])
+        vout = find_vout_for_address(self.nodes[0], txid, addr)
+        rawTx = self.nodes[1].createrawtransaction([{'txid': txid, 'vout': vout}], [{self.new_address(1): 9.999}, {"fee": 0.001}])
         rawTxSigned = self.nodes[1].signrawtransactionwithwallet(rawTx)
         txId = self.nodes[1].sendrawtransaction(rawTxSigned['hex'])
-        self.generateblock(self.nodes[0], output=self.nodes[0].getnewaddress(), transactions=[rawTxSigned['hex']])
-        err_msg = (
-            "No such mempool transaction. Use -txindex or provide a block hash to enable"
-            " blockchain transaction queries. Use gettransaction for wallet transactions."
-        )
+        self.generateblock(self.nodes[0], output=self.new_address(0), transactions=[rawTxSigned['hex']])
 
-        for n in [0, 3]:
+        def check_getrawtransaction(n):
             self.log.info(f"Test getrawtransaction {'with' if n == 0 else 'without'} -txindex")
 
             if n == 0:
@@ -126,23 +226,29 @@ class RawTransactionsTest(BitcoinTestFramework):
                 assert_equal(self.nodes[n].getrawtransaction(txId, True)["hex"], rawTxSigned['hex'])
             else:
                 # Without -txindex, expect to raise.
-                for verbose in [None, 0, False, 1, True]:
-                    assert_raises_rpc_error(-5, err_msg, self.nodes[n].getrawtransaction, txId, verbose)
-
-            # 6. invalid parameters - supply txid and invalid boolean values (strings) for verbose
-            for value in ["True", "False"]:
-                assert_raises_rpc_error(-1, "not a boolean", self.nodes[n].getrawtransaction, txid=txId, verbose=value)
+                assert_raises_rpc_error_batch(self.nodes[n], "getrawtransaction", [
+                    (-5, ERR_NO_TXINDEX, [txId, verbose]) for verbose in [None, 0, False, 1, True]
+                ])
 
-            # 7. invalid parameters - supply txid and empty array
-            assert_raises_rpc_error(-1, "not a boolean", self.nodes[n].getrawtransaction, txId, [])
+            assert_raises_rpc_error_batch(self.nodes[n], "getrawtransaction", [
+                # 6. invalid parameters - supply txid and invalid boolean values (strings) for verbose
+                (-1, "not a boolean", {'txid': txId, 'verbose': "True"}),
+                (-1, "not a boolean", {'txid': txId, 'verbose': "False"}),
+                # 7. invalid parameters - supply txid and empty array
+                (-1, "not a boolean", [txId, []]),
+                # 8. invalid parameters - supply txid and empty dict
+                (-1, "not a boolean", [txId, {}]),
+            ])
 
-            # 8. invalid parameters - supply txid and empty dict
-            assert_raises_rpc_error(-1, "not a boolean", self.nodes[n].getrawtransaction, txId, {})
+        # The checks only read from each node, so run them against both nodes at once
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(check_getrawtransaction, [0, 3]))
 
         # Make a tx by sending, then generate 2 blocks; block1 has the tx in it
-        tx = self.nodes[2].sendtoaddress(self.nodes[1].getnewaddress(), 1)
+        tx = self.nodes[2].sendtoaddress(self.new_address(1), 1)
         block1, block2 = self.generate(self.nodes[2], 2)
-        for n in [0, 3]:
+
+        def check_getrawtransaction_with_blockhash(n):
             self.log.info(f"Test getrawtransaction {'with' if n == 0 else 'without'} -txindex, with blockhash")
             # We should be able to get the raw transaction by providing the correct block
             gottx = self.nodes[n].getrawtransaction(txid=tx, verbose=True, blockhash=block1)
@@ -155,17 +261,15 @@ class RawTransactionsTest(BitcoinTestFramework):
                 assert 'in_active_chain' not in gottx
             else:
                 self.log.info("Test getrawtransaction without -txindex, without blockhash: expect the call to raise")
-                assert_raises_rpc_error(-5, err_msg, self.nodes[n].getrawtransaction, txid=tx, verbose=True)
+                assert_raises_rpc_error(-5, ERR_NO_TXINDEX, self.nodes[n].getrawtransaction, txid=tx, verbose=True)
             # We should not get the tx if we provide an unrelated block
             assert_raises_rpc_error(-5, "No such transaction found", self.nodes[n].getrawtransaction, txid=tx, blockhash=block2)
             # An invalid block hash should raise the correct errors
             assert_raises_rpc_error(-1, "JSON value is not a string as expected", self.nodes[n].getrawtransaction, txid=tx, blockhash=True)
             assert_raises_rpc_error(-8, "parameter 3 must be of length 64 (not 6, for 'foobar')", self.nodes[n].getrawtransaction, txid=tx, blockhash="foobar")
             assert_raises_rpc_error(-8, "parameter 3 must be of length 64 (not 8, for 'abcd1234')", self.nodes[n].getrawtransaction, txid=tx, blockhash="abcd1234")
-            foo = "ZZZ0000000000000000000000000000000000000000000000000000000000000"
-            assert_raises_rpc_error(-8, f"parameter 3 must be hexadecimal string (not '{foo}')", self.nodes[n].getrawtransaction, txid=tx, blockhash=foo)
-            bar = "0000000000000000000000000000000000000000000000000000000000000000"
-            assert_raises_rpc_error(-5, "Block hash not found", self.nodes[n].getrawtransaction, txid=tx, blockhash=bar)
+            assert_raises_rpc_error(-8, f"parameter 3 must be hexadecimal string (not '{INVALID_HEX}')", self.nodes[n].getrawtransaction, txid=tx, blockhash=INVALID_HEX)
+            assert_raises_rpc_error(-5, "Block hash not found", self.nodes[n].getrawtransaction, txid=tx, blockhash=ZERO_HASH)
             # Undo the blocks and verify that "in_active_chain" is false.
             self.nodes[n].invalidateblock(block1)
             gottx = self.nodes[n].getrawtransaction(txid=tx, verbose=True, blockhash=block1)
@@ -173,88 +277,88 @@ class RawTransactionsTest(BitcoinTestFramework):
             self.nodes[n].reconsiderblock(block1)
             assert_equal(self.nodes[n].getbestblockhash(), block2)
 
+        # Invalidating a block on one node leaves the other node's chain untouched
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(check_getrawtransaction_with_blockhash, [0, 3]))
+
         self.log.info("Test getrawtransaction on genesis block coinbase returns an error")
         block = self.nodes[0].getblock(self.nodes[0].getblockhash(0))
         assert_raises_rpc_error(-5, "The genesis block coinbase is not considered an ordinary transaction", self.nodes[0].getrawtransaction, block['merkleroot'])
 
     def createrawtransaction_tests(self):
         self.log.info("Test createrawtransaction")
-        # Test `createrawtransaction` required parameters
-        assert_raises_rpc_error(-1, "createrawtransaction", self.nodes[0].createrawtransaction)
-        assert_raises_rpc_error(-1, "createrawtransaction", self.nodes[0].createrawtransaction, [])
-
-        # Test `createrawtransaction` invalid extra parameters
-        # ELEMENTS: we have extra elements arguments
-        assert_raises_rpc_error(-1, "createrawtransaction", self.nodes[0].createrawtransaction, [], [], 0, False, 'foo')
-
-        # Test `createrawtransaction` invalid `inputs`
-        assert_raises_rpc_error(-3, "Expected type array", self.nodes[0].createrawtransaction, 'foo', {})
-        assert_raises_rpc_error(-1, "JSON value is not an object as expected", self.nodes[0].createrawtransaction, ['foo'], [])
-        assert_raises_rpc_error(-1, "JSON value is not a string as expected", self.nodes[0].createrawtransaction, [{}], [])
-        assert_raises_rpc_error(-8, "txid must be of length 64 (not 3, for 'foo')", self.nodes[0].createrawtransaction, [{'txid': 'foo'}], [])
+        address = self.new_address(0)
+        address2 = self.new_address(0)
         txid = "ZZZ7bb8b1697ea987f3b223ba7819250cae33efacb068d23dc24859824a77844"
-        assert_raises_rpc_error(-8, f"txid must be hexadecimal string (not '{txid}')", self.nodes[0].createrawtransaction, [{'txid': txid, 'vout': 0}], [{}])
-        # ELEMENTS: these are rejected because txid is not hex
-        # assert_raises_rpc_error(-8, "Invalid parameter, missing vout key", self.nodes[0].createrawtransaction, [{'txid': txid}], [])
-        # assert_raises_rpc_error(-8, "Invalid parameter, missing vout key", self.nodes[0].createrawtransaction, [{'txid': txid, 'vout': 'foo'}], [])
-        # assert_raises_rpc_error(-8, "Invalid parameter, vout cannot be negative", self.nodes[0].createrawtransaction, [{'txid': txid, 'vout': -1}], [])
-        # sequence number out of range
-        for invalid_seq in [-1, 4294967296]:
-            inputs = [{'txid': TXID, 'vout': 1, 'sequence': invalid_seq}]
-            outputs = [{self.nodes[0].getnewaddress(): 1}]
-            assert_raises_rpc_error(-8, 'Invalid parameter, sequence number is out of range',
-                                    self.nodes[0].createrawtransaction, inputs, outputs)
+        assert_raises_rpc_error_batch(self.nodes[0], "createrawtransaction", [
+            # Test `createrawtransaction` required parameters
+            (-1, "createrawtransaction", []),
+            (-1, "createrawtransaction", [[]]),
+
+            # Test `createrawtransaction` invalid extra parameters
+            # ELEMENTS: we have extra elements arguments
+            (-1, "createrawtransaction", [[], [], 0, False, 'foo']),
+
+            # Test `createrawtransaction` invalid `inputs`
+            (-3, "Expected type array", ['foo', {}]),
+            (-1, "JSON value is not an object as expected", [['foo'], []]),
+            (-1, "JSON value is not a string as expected", [[{}], []]),
+            (-8, "txid must be of length 64 (not 3, for 'foo')", [[{'txid': 'foo'}], []]),
+            (-8, f"txid must be hexadecimal string (not '{txid}')", [[{'txid': txid, 'vout': 0}], [{}]]),
+            # ELEMENTS: these are rejected because txid is not hex
+            # (-8, "Invalid parameter, missing vout key", [[{'txid': txid}], []]),
+            # (-8, "Invalid parameter, missing vout key", [[{'txid': txid, 'vout': 'foo'}], []]),
+            # (-8, "Invalid parameter, vout cannot be negative", [[{'txid': txid, 'vout': -1}], []]),
+            # sequence number out of range
+            (-8, 'Invalid parameter, sequence number is out of range', [[{'txid': TXID, 'vout': 1, 'sequence': -1}], [{address: 1}]]),
+            (-8, 'Invalid parameter, sequence number is out of range', [[{'txid': TXID, 'vout': 1, 'sequence': 4294967296}], [{address: 1}]]),
+
+            # Test `createrawtransaction` invalid `outputs`
+            (-3, "Expected type array, got string", [[], 'foo']),
+            (-8, "Data must be hexadecimal string", [[], [{'data': 'foo'}]]),
+            (-5, "Invalid Bitcoin address", [[], [{'foo': 0}]]),
+            (-3, "Invalid amount", [[], [{address: 'foo'}]]),
+            (-3, "Amount out of range", [[], [{address: -1}]]),
+            (-8, "Invalid parameter, duplicated address and asset: %s" % address, [[], [{address: 1}, {address: 1}]]),
+            (-8, "Invalid parameter, duplicate key: data", [[], [{"data": 'aa'}, {"data": "bb"}]]),
+            (-1, "JSON value is not an object as expected", [[], [['key-value pair1'], ['2']]]),
+
+            # Test `createrawtransaction` invalid `locktime`
+            (-3, "Expected type number", [[], [], 'foo']),
+            (-8, "Invalid parameter, locktime out of range", [[], [], -1]),
+            (-8, "Invalid parameter, locktime out of range", [[], [], 4294967296]),
+
+            # Test `createrawtransaction` invalid `replaceable`
+            (-3, "Expected type bool", [[], [], 0, 'foo']),
+        ])
+
         # with valid sequence number
         for valid_seq in [1000, 4294967294]:
             inputs = [{'txid': TXID, 'vout': 1, 'sequence': valid_seq}]
-            outputs = [{self.nodes[0].getnewaddress(): 1}]
+            outputs = [{address: 1}]
             rawtx = self.nodes[0].createrawtransaction(inputs, outputs)
             decrawtx = self.nodes[0].decoderawtransaction(rawtx)
             assert_equal(decrawtx['vin'][0]['sequence'], valid_seq)
 
-        # Test `createrawtransaction` invalid `outputs`
-        address = self.nodes[0].getnewaddress()
-        address2 = self.nodes[0].getnewaddress()
-        assert_raises_rpc_error(-3, "Expected type array, got string", self.nodes[0].createrawtransaction, [], 'foo')
+        # empty outputs are accepted
         self.nodes[0].createrawtransaction(inputs=[], outputs=[])
-        assert_raises_rpc_error(-8, "Data must be hexadecimal string", self.nodes[0].createrawtransaction, [], [{'data': 'foo'}])
-        assert_raises_rpc_error(-5, "Invalid Bitcoin address", self.nodes[0].createrawtransaction, [], [{'foo': 0}])
-        assert_raises_rpc_error(-3, "Invalid amount", self.nodes[0].createrawtransaction, [], [{address: 'foo'}])
-        assert_raises_rpc_error(-3, "Amount out of range", self.nodes[0].createrawtransaction, [], [{address: -1}])
-        assert_raises_rpc_error(-8, "Invalid parameter, duplicated address and asset: %s" % address, self.nodes[0].createrawtransaction, [], [{address: 1}, {address: 1}])
-        assert_raises_rpc_error(-8, "Invalid parameter, duplicate key: data", self.nodes[0].createrawtransaction, [], [{"data": 'aa'}, {"data": "bb"}])
-        assert_raises_rpc_error(-1, "JSON value is not an object as expected", self.nodes[0].createrawtransaction, [], [['key-value pair1'], ['2']])
-
-        # Test `createrawtransaction` invalid `locktime`
-        assert_raises_rpc_error(-3, "Expected type number", self.nodes[0].createrawtransaction, [], [], 'foo')
-        assert_raises_rpc_error(-8, "Invalid parameter, locktime out of range", self.nodes[0].createrawtransaction, [], [], -1)
-        assert_raises_rpc_error(-8, "Invalid parameter, locktime out of range", self.nodes[0].createrawtransaction, [], [], 4294967296)
-
-        # Test `createrawtransaction` invalid `replaceable`
-        assert_raises_rpc_error(-3, "Expected type bool", self.nodes[0].createrawtransaction, [], [], 0, 'foo')
 
         # Test that createrawtransaction accepts an array and object as outputs
         # One output
-        tx = tx_from_hex(self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}]))
+        rawtx = self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}])
+        tx = tx_from_hex(rawtx)
         assert_equal(len(tx.vout), 1)
-        assert_equal(
-            tx.serialize().hex(),
-            self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}]),
-        )
+        assert_equal(tx.serialize().hex(), rawtx)
         # Two outputs
-        tx = tx_from_hex(self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}, {address2: 99}]))
+        rawtx = self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}, {address2: 99}])
+        tx = tx_from_hex(rawtx)
         assert_equal(len(tx.vout), 2)
-        assert_equal(
-            tx.serialize().hex(),
-            self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}, {address2: 99}]),
-        )
+        assert_equal(tx.serialize().hex(), rawtx)
         # Multiple mixed outputs
-        tx = tx_from_hex(self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}, {address2: 99}, {'data': '99'}]))
+        rawtx = self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}, {address2: 99}, {'data': '99'}])
+        tx = tx_from_hex(rawtx)
         assert_equal(len(tx.vout), 3)
-        assert_equal(
-            tx.serialize().hex(),
-            self.nodes[2].createrawtransaction(inputs=[{'txid': TXID, 'vout': 9}], outputs=[{address: 99}, {address2: 99}, {'data': '99'}]),
-        )
+        assert_equal(tx.serialize().hex(), rawtx)
 
     def signrawtransactionwithwallet_tests(self):
         for type in ["bech32", "p2sh-segwit", "legacy"]:
@@ -263,7 +367,7 @@ class RawTransactionsTest(BitcoinTestFramework):
             addrinfo = self.nodes[0].getaddressinfo(addr)
             pubkey = addrinfo["scriptPubKey"]
             inputs = [{'txid': TXID, 'vout': 3, 'sequence': 1000}]
-            outputs = [{self.nodes[0].getnewaddress(): 1}]
+            outputs = [{self.new_address(0): 1}]
             rawtx = self.nodes[0].createrawtransaction(inputs, outputs)
 
 
@@ -309,7 +413,7 @@ class RawTransactionsTest(BitcoinTestFramework):
     def sendrawtransaction_tests(self):
         self.log.info('sendrawtransaction with missing input')
         inputs  = [ {'txid' : "1d1d4e24ed99057e84c3f80fd8fbec79ed9e1acee37da269356ecea000000000", 'vout' : 1}] #won't exists
-        outputs = [{ self.nodes[0].getnewaddress() : 4.998 }]
+        outputs = [{ self.new_address(0) : 4.998 }]
         rawtx   = self.nodes[2].createrawtransaction(inputs, outputs)
         rawtx   = self.nodes[2].signrawtransactionwithwallet(rawtx)
         assert_raises_rpc_error(-25, "bad-txns-inputs-missingorspent", self.nodes[2].sendrawtransaction, rawtx['hex'])
@@ -318,62 +422,68 @@ class RawTransactionsTest(BitcoinTestFramework):
         self.log.info("Test sendrawtransaction/testmempoolaccept with maxfeerate")
         fee_exceeds_max = "Fee exceeds maximum configured by user (e.g. -maxtxfee, maxfeerate)"
 
-        # Test a transaction with a small fee.
-        txId = self.nodes[0].sendtoaddress(self.nodes[2].getnewaddress(), 1.0)
-        rawTx = self.nodes[0].getrawtransaction(txId, True)
-        vout = next(o for o in rawTx['vout'] if o['value'] == Decimal('1.00000000'))
+        # Fund the small and the large fee transactions below from one transaction.
+        small_fee_addr = self.new_address(2)
+        large_fee_addr = self.new_address(2)
+        txId = self.nodes[0].sendmany("", {small_fee_addr: 1.0, large_fee_addr: 1.0})
+        self.generate(self.nodes[0], 1)
+        small_fee_vout = find_vout_for_address(self.nodes[0], txId, small_fee_addr)
+        large_fee_vout = find_vout_for_address(self.nodes[0], txId, large_fee_addr)
 
-        self.sync_all()
-        inputs = [{"txid": txId, "vout": vout['n']}]
+        # Test a transaction with a small fee.
+        inputs = [{"txid": txId, "vout": small_fee_vout}]
         # Fee 10,000 satoshis, (1 - (10000 sat * 0.00000001 BTC/sat)) = 0.9999
-        outputs = [{self.nodes[0].getnewaddress(): Decimal("0.99990000")}, {"fee": 0.0001}]
+        outputs = [{self.new_address(0): Decimal("0.99990000")}, {"fee": 0.0001}]
         rawTx = self.nodes[2].createrawtransaction(inputs, outputs)
         rawTxSigned = self.nodes[2].signrawtransactionwithwallet(rawTx)
         assert_equal(rawTxSigned['complete'], True)
+        testres, testres_default = batch_results(self.nodes[2], [
+            self.nodes[2].testmempoolaccept.get_request([rawTxSigned['hex']], 0.00001000),
+            self.nodes[2].testmempoolaccept.get_request(rawtxs=[rawTxSigned['hex']]),
+        ])
         # Fee 10,000 satoshis, ~100 b transaction, fee rate should land around 100 sat/byte = 0.00100000 BTC/kB
         # Thus, testmempoolaccept should reject
-        testres = self.nodes[2].testmempoolaccept([rawTxSigned['hex']], 0.00001000)[0]
-        assert_equal(testres['allowed'], False)
-        assert_equal(testres['reject-reason'], 'max-fee-exceeded')
+        assert_equal(testres[0]['allowed'], False)
+        assert_equal(testres[0]['reject-reason'], 'max-fee-exceeded')
         # and sendrawtransaction should throw
         assert_raises_rpc_error(-25, fee_exceeds_max, self.nodes[2].sendrawtransaction, rawTxSigned['hex'], 0.00001000)
         # and the following calls should both succeed
-        testres = self.nodes[2].testmempoolaccept(rawtxs=[rawTxSigned['hex']])[0]
-        assert_equal(testres['allowed'], True)
+        assert_equal(testres_default[0]['allowed'], True)
         self.nodes[2].sendrawtransaction(hexstring=rawTxSigned['hex'])
 
         # Test a transaction with a large fee.
-        txId = self.nodes[0].sendtoaddress(self.nodes[2].getnewaddress(), 1.0)
-        rawTx = self.nodes[0].getrawtransaction(txId, True)
-        vout = next(o for o in rawTx['vout'] if o['value'] == Decimal('1.00000000'))
-
-        self.sync_all()
-        inputs = [{"txid": txId, "vout": vout['n']}]
+        inputs = [{"txid": txId, "vout": large_fee_vout}]
         # Fee 2,000,000 satoshis, (1 - (2000000 sat * 0.00000001 BTC/sat)) = 0.98
-        outputs = [{self.nodes[0].getnewaddress() : Decimal("0.98000000")}, {"fee": 0.02}]
+        outputs = [{self.new_address(0) : Decimal("0.98000000")}, {"fee": 0.02}]
         rawTx = self.nodes[2].createrawtransaction(inputs, outputs)
         rawTxSigned = self.nodes[2].signrawtransactionwithwallet(rawTx)
         assert_equal(rawTxSigned['complete'], True)
+        testres, testres_maxfeerate = batch_results(self.nodes[2], [
+            self.nodes[2].testmempoolaccept.get_request([rawTxSigned['hex']]),
+            self.nodes[2].testmempoolaccept.get_request(rawtxs=[rawTxSigned['hex']], maxfeerate='0.20000000'),
+        ])
         # Fee 2,000,000 satoshis, ~100 b transaction, fee rate should land around 20,000 sat/byte = 0.20000000 BTC/kB
         # Thus, testmempoolaccept should reject
-        testres = self.nodes[2].testmempoolaccept([rawTxSigned['hex']])[0]
-        assert_equal(testres['allowed'], False)
-        assert_equal(testres['reject-reason'], 'max-fee-exceeded')
+        assert_equal(testres[0]['allowed'], False)
+        assert_equal(testres[0]['reject-reason'], 'max-fee-exceeded')
         # and sendrawtransaction should throw
         assert_raises_rpc_error(-25, fee_exceeds_max, self.nodes[2].sendrawtransaction, rawTxSigned['hex'])
         # and the following calls should both succeed
-        testres = self.nodes[2].testmempoolaccept(rawtxs=[rawTxSigned['hex']], maxfeerate='0.20000000')[0]
-        assert_equal(testres['allowed'], True)
+        assert_equal(testres_maxfeerate[0]['allowed'], True)
         self.nodes[2].sendrawtransaction(hexstring=rawTxSigned['hex'], maxfeerate='0.20000000')
 
         self.log.info("Test sendrawtransaction/testmempoolaccept with tx already in the chain")
         self.generate(self.nodes[2], 1)
-        for node in self.nodes:
+
+        def check_already_in_chain(node):
             testres = node.testmempoolaccept([rawTxSigned['hex']])[0]
             assert_equal(testres['allowed'], False)
             assert_equal(testres['reject-reason'], 'txn-already-known')
             assert_raises_rpc_error(-27, 'Transaction already in block chain', node.sendrawtransaction, rawTxSigned['hex'])
 
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as executor:
+            list(executor.map(check_already_in_chain, self.nodes))
+
     def decoderawtransaction_tests(self):
         self.log.info("Test decoderawtransaction")
         # witness transaction
@@ -386,20 +496,21 @@ class RawTransactionsTest(BitcoinTestFramework):
     def transaction_version_number_tests(self):
         self.log.info("Test transaction version numbers")
 
-        # Test the minimum transaction version number that fits in a signed 32-bit integer.
-        # As transaction version is unsigned, this should convert to its unsigned equivalent.
-        tx = CTransaction()
-        tx.nVersion = -0x80000000
-        rawtx = tx.serialize().hex()
-        decrawtx = self.nodes[0].decoderawtransaction(rawtx)
-        assert_equal(decrawtx['version'], 0x80000000)
-
-        # Test the maximum transaction version number that fits in a signed 32-bit integer.
-        tx = CTransaction()
-        tx.nVersion = 0x7fffffff
-        rawtx = tx.serialize().hex()
-        decrawtx = self.nodes[0].decoderawtransaction(rawtx)
-        assert_equal(decrawtx['version'], 0x7fffffff)
+        # (nVersion, decoded version) pairs
+        versions = [
+            # The minimum transaction version number that fits in a signed 32-bit integer.
+            # As transaction version is unsigned, this should convert to its unsigned equivalent.
+            (-0x80000000, 0x80000000),
+            # The maximum transaction version number that fits in a signed 32-bit integer.
+            (0x7fffffff, 0x7fffffff),
+        ]
+        requests = []
+        for version, _ in versions:
+            tx = CTransaction()
+            tx.nVersion = version
+            requests.append(self.nodes[0].decoderawtransaction.get_request(tx.serialize().hex()))
+        for decrawtx, (_, expected) in zip(batch_results(self.nodes[0], requests), versions):
+            assert_equal(decrawtx['version'], expected)
 
     def raw_multisig_transaction_legacy_tests(self):
         self.log.info("Test raw multisig transactions (legacy)")
@@ -407,11 +518,10 @@ class RawTransactionsTest(BitcoinTestFramework):
         # The multisig workflow with descriptor wallets uses PSBTs and is tested elsewhere, no need to do them here.
 
         # 2of2 test
-        addr1 = self.nodes[2].getnewaddress()
-        addr2 = self.nodes[2].getnewaddress()
+        addr1 = self.new_address(2)
+        addr2 = self.new_address(2)
 
-        addr1Obj = self.nodes[2].getaddressinfo(addr1)
-        addr2Obj = self.nodes[2].getaddressinfo(addr2)
+        addr1Obj, addr2Obj = self.get_address_infos(2, [addr1, addr2])
 
         # Tests for createmultisig and addmultisigaddress
         assert_raises_rpc_error(-5, "Invalid public key", self.nodes[0].createmultisig, 1, ["01020304"])
@@ -427,7 +537,7 @@ class RawTransactionsTest(BitcoinTestFramework):
 
         # send 1.2 BTC to msig adr
         txId = self.nodes[0].sendtoaddress(mSigObj, 1.2)
-        self.sync_all()
+        self.sync_mempools_rpc()
         self.generate(self.nodes[0], 1)
         # node2 has both keys of the 2of2 ms addr, tx should affect the balance
         assert_equal(self.nodes[2].getbalance()['bitcoin'], bal['bitcoin'] + Decimal('1.20000000'))
@@ -435,20 +545,19 @@ class RawTransactionsTest(BitcoinTestFramework):
 
         # 2of3 test from different nodes
         bal = self.nodes[2].getbalance()
-        addr1 = self.nodes[1].getnewaddress()
-        addr2 = self.nodes[2].getnewaddress()
-        addr3 = self.nodes[2].getnewaddress()
+        addr1 = self.new_address(1)
+        addr2 = self.new_address(2)
+        addr3 = self.new_address(2)
 
         addr1Obj = self.nodes[1].getaddressinfo(addr1)
-        addr2Obj = self.nodes[2].getaddressinfo(addr2)
-        addr3Obj = self.nodes[2].getaddressinfo(addr3)
+        addr2Obj, addr3Obj = self.get_address_infos(2, [addr2, addr3])
 
         mSigObj = self.nodes[2].addmultisigaddress(2, [addr1Obj['pubkey'], addr2Obj['pubkey'], addr3Obj['pubkey']])['address']
 
         txId = self.nodes[0].sendtoaddress(mSigObj, 2.2)
         decTx = self.nodes[0].gettransaction(txId)
         rawTx = self.nodes[0].decoderawtransaction(decTx['hex'])
-        self.sync_all()
+        self.sync_mempools_rpc()
         self.generate(self.nodes[0], 1)
 
         # THIS IS AN INCOMPLETE FEATURE
@@ -457,11 +566,11 @@ class RawTransactionsTest(BitcoinTestFramework):
 
         txDetails = self.nodes[0].gettransaction(txId, True)
         rawTx = self.nodes[0].decoderawtransaction(txDetails['hex'])
-        vout = next(o for o in rawTx['vout'] if o['value'] == Decimal('2.20000000'))
+        vout = rawTx['vout'][find_vout_for_address(self.nodes[0], txId, mSigObj)]
 
         bal = self.nodes[0].getbalance()
         inputs = [{"txid": txId, "vout": vout['n'], "scriptPubKey": vout['scriptPubKey']['hex'], "amount": vout['value']}]
-        outputs = [{self.nodes[0].getnewaddress(): 2.19}, {"fee": 0.01}]
+        outputs = [{self.new_address(0): 2.19}, {"fee": 0.01}]
         rawTx = self.nodes[2].createrawtransaction(inputs, outputs)
         rawTxPartialSigned = self.nodes[1].signrawtransactionwithwallet(rawTx, inputs)
         assert_equal(rawTxPartialSigned['complete'], False)  # node1 only has one key, can't comp. sign the tx
@@ -470,14 +579,14 @@ class RawTransactionsTest(BitcoinTestFramework):
         assert_equal(rawTxSigned['complete'], True)  # node2 can sign the tx compl., own two of three keys
         self.nodes[2].sendrawtransaction(rawTxSigned['hex'])
         rawTx = self.nodes[0].decoderawtransaction(rawTxSigned['hex'])
-        self.sync_all()
+        self.sync_mempools_rpc()
         self.generate(self.nodes[0], 1)
         assert_equal(self.nodes[0].getbalance()['bitcoin'], bal['bitcoin'] + Decimal('50.00000000') + Decimal('2.19000000'))  # block reward + tx
 
         # 2of2 test for combining transactions
         bal = self.nodes[2].getbalance()
-        addr1 = self.nodes[1].getnewaddress()
-        addr2 = self.nodes[2].getnewaddress()
+        addr1 = self.new_address(1)
+        addr2 = self.new_address(2)
 
         addr1Obj = self.nodes[1].getaddressinfo(addr1)
         addr2Obj = self.nodes[2].getaddressinfo(addr2)
@@ -489,18 +598,18 @@ class RawTransactionsTest(BitcoinTestFramework):
         txId = self.nodes[0].sendtoaddress(mSigObj, 2.2)
         decTx = self.nodes[0].gettransaction(txId)
         rawTx2 = self.nodes[0].decoderawtransaction(decTx['hex'])
-        self.sync_all()
+        self.sync_mempools_rpc()
         self.generate(self.nodes[0], 1)
 
         assert_equal(self.nodes[2].getbalance(), bal)  # the funds of a 2of2 multisig tx should not be marked as spendable
 
         txDetails = self.nodes[0].gettransaction(txId, True)
         rawTx2 = self.nodes[0].decoderawtransaction(txDetails['hex'])
-        vout = next(o for o in rawTx2['vout'] if o['value'] == Decimal('2.20000000'))
+        vout = rawTx2['vout'][find_vout_for_address(self.nodes[0], txId, mSigObj)]
 
         bal = self.nodes[0].getbalance()
         inputs = [{"txid": txId, "vout": vout['n'], "scriptPubKey": vout['scriptPubKey']['hex'], "redeemScript": mSigObjValid['hex'], "amount": vout['value']}]
-        outputs = [{self.nodes[0].getnewaddress(): 2.19}, {"fee": 0.01}]
+        outputs = [{self.new_address(0): 2.19}, {"fee": 0.01}]
         rawTx2 = self.nodes[2].createrawtransaction(inputs, outputs)
         rawTxPartialSigned1 = self.nodes[1].signrawtransactionwithwallet(rawTx2, inputs)
         self.log.debug(rawTxPartialSigned1)
@@ -513,7 +622,7 @@ class RawTransactionsTest(BitcoinTestFramework):
         self.log.debug(rawTxComb)
         self.nodes[2].sendrawtransaction(rawTxComb)
         rawTx2 = self.nodes[0].decoderawtransaction(rawTxComb)
-        self.sync_all()
+        self.sync_mempools_rpc()
         self.generate(self.nodes[0], 1)
         assert_equal(self.nodes[0].getbalance()['bitcoin'], bal['bitcoin'] + Decimal('50.00000000') + Decimal('2.19000000'))  # block reward + tx
 